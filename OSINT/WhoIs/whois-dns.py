@@ -1,62 +1,513 @@
 import argparse              # Imports argparse for handling command‑line arguments
+import asyncio               # Event loop driving the concurrent batch mode
+import csv                   # CSV serialisation for batch results
+import json                  # JSON Lines serialisation for batch results
+import os                    # Output-format detection from the file extension
+import sqlite3               # Persistent on-disk cache shared between runs
+import sys                   # stdin/stdout/stderr streams for batch I/O
+import time                  # Wall-clock timing for throughput statistics
+from collections import Counter  # Failure tallies, broken down by error code
+from concurrent.futures import ThreadPoolExecutor  # Separate pool for blocking WHOIS lookups
+from datetime import datetime  # WHOIS dates arrive as datetimes and leave as ISO 8601 strings
 import whois                 # Imports the python‑whois library for WHOIS lookups
-import dns.resolver          # Imports dnspython's resolver for DNS queries
-from pprint import pprint
+import dns.asyncresolver     # Imports dnspython's asyncio resolver for concurrent DNS queries
+import dns.exception         # Timeout base class, for error classification
+import dns.rdatatype         # Record type constants, used to spot SOA records in negative answers
+import dns.resolver          # Exception types and the in-memory LRU answer cache
 
 # ... Also an exercise in literate programming...
 
+# A: Maps a domain name to an IPv4 address.
+# AAAA: Maps a domain name to an IPv6 address.
+# MX: Specifies the mail servers responsible for receiving e‑mail for the domain.
+# NS: Lists the authoritative name servers that hold the domain’s DNS zone.
+# TXT: Holds arbitrary text data, often used for SPF, DKIM, DMARC, and other verification records.
+RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'TXT']  # DNS record types to query
+
+NEGATIVE_TTL = 300        # Fallback negative-caching time when a response carries no SOA
+WHOIS_TTL = 24 * 60 * 60  # Registration data rarely changes within a day
+WHOIS_NEGATIVE_TTL = 60 * 60  # A "no match" is definitive too, but an unregistered name can be taken at any time
+TRANSIENT_WHOIS_ERRORS = {'RATELIMIT', 'NETWORK', 'ERROR'}  # Worth retrying next run, so never cached
+
+WHOIS_FIELDS = ['registrar', 'creation_date', 'expiration_date', 'updated_date', 'nameservers']
+
+# One domain's findings, flattened to the handful of fields we actually analyse.
+# __slots__ keeps each instance small when many are in flight at once.
+class DomainResult:
+  __slots__ = ('domain', *WHOIS_FIELDS, 'records', 'errors', 'whois_ms', 'dns_ms')
+
+  def __init__(self, domain, registrar=None, creation_date=None, expiration_date=None, updated_date=None,
+               nameservers=None, records=None, errors=None, whois_ms=None, dns_ms=None):
+    self.domain = domain
+    self.registrar = registrar              # Registrar name, as reported by WHOIS
+    self.creation_date = creation_date      # ISO 8601 strings, or None if unknown
+    self.expiration_date = expiration_date
+    self.updated_date = updated_date
+    self.nameservers = nameservers or []    # Lower-cased, sorted, de-duplicated
+    self.records = records or {}            # Record type -> list of answers
+    self.errors = errors or {}              # 'whois' or record type -> error code
+    self.whois_ms = whois_ms                # Lookup times in milliseconds (None if skipped)
+    self.dns_ms = dns_ms
+
+  def to_dict(self):
+    return {name: getattr(self, name) for name in self.__slots__}
+
+  @classmethod
+  def from_dict(cls, data):
+    return cls(**data)
+
+  # Flat row for CSV: lists and the error map are JSON-encoded in their cells, since
+  # TXT records (SPF, DMARC) routinely contain any delimiter we might pick
+  def to_row(self):
+    row = [self.domain, *(getattr(self, name) for name in WHOIS_FIELDS[:-1]), json.dumps(self.nameservers)]
+    row += [json.dumps(self.records.get(rtype, [])) for rtype in RECORD_TYPES]
+    row += [json.dumps(self.errors), self.whois_ms, self.dns_ms]
+    return ['' if value is None else value for value in row]
+
+  @classmethod
+  def from_row(cls, row):
+    row = dict(zip(CSV_HEADER, row))
+    number = lambda value: float(value) if value else None
+    return cls(
+      row['domain'],
+      *(row[name] or None for name in WHOIS_FIELDS[:-1]),
+      nameservers=json.loads(row['nameservers']),
+      records={rtype: json.loads(row[rtype]) for rtype in RECORD_TYPES},
+      errors=json.loads(row['errors']),
+      whois_ms=number(row['whois_ms']), dns_ms=number(row['dns_ms'])
+    )
+
+CSV_HEADER = ['domain', *WHOIS_FIELDS, *RECORD_TYPES, 'errors', 'whois_ms', 'dns_ms']
+
+# Short, stable error codes instead of free-text messages
+def dns_error_code(e):
+  if isinstance(e, dns.resolver.NXDOMAIN):
+    return 'NXDOMAIN'       # The name doesn't exist
+  if isinstance(e, dns.resolver.NoAnswer):
+    return 'NOANSWER'       # The name exists, but has no records of this type
+  if isinstance(e, dns.resolver.NoNameservers):
+    return 'SERVFAIL'       # Every nameserver refused or failed
+  if isinstance(e, dns.exception.Timeout):
+    return 'TIMEOUT'
+  return 'ERROR'
+
+# Newer python-whois releases keep a hierarchy of exceptions in whois.exceptions;
+# older ones only have whois.parser.PywhoisError, raised when the registry has no match
+WHOIS_EXCEPTIONS = getattr(whois, 'exceptions', None)
+
+def whois_error_code(e):
+  if WHOIS_EXCEPTIONS is not None:
+    if isinstance(e, WHOIS_EXCEPTIONS.WhoisDomainNotFoundError):
+      return 'NOTFOUND'     # The registry has no match
+    if isinstance(e, WHOIS_EXCEPTIONS.WhoisQuotaExceededError):
+      return 'RATELIMIT'    # The registry has had enough of us for now
+    if isinstance(e, WHOIS_EXCEPTIONS.UnknownTldError):
+      return 'UNKNOWNTLD'   # No WHOIS server known for this TLD
+    if isinstance(e, WHOIS_EXCEPTIONS.FailedParsingWhoisOutputError):
+      return 'PARSEERROR'   # The server answered, but not in a form we understand
+  elif isinstance(e, whois.parser.PywhoisError):
+    return 'NOTFOUND'
+  if isinstance(e, (TimeoutError, ConnectionError)):
+    return 'NETWORK'
+  return 'ERROR'
+
+# WHOIS dates may be a single datetime, a list of them (one per server), or a bare string
+def normalise_date(value):
+  if isinstance(value, list):
+    value = next((v for v in value if v), None)
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return str(value) if value else None
+
+# Picks out the fields we keep from a raw WHOIS record
+def normalise_whois(w):
+  registrar = w.get('registrar')
+  nameservers = w.get('name_servers') or []
+  if isinstance(nameservers, str):
+    nameservers = [nameservers]
+  return {
+    'registrar': registrar[0] if isinstance(registrar, list) else registrar,
+    'creation_date': normalise_date(w.get('creation_date')),
+    'expiration_date': normalise_date(w.get('expiration_date')),
+    'updated_date': normalise_date(w.get('updated_date')),
+    'nameservers': sorted({ns.lower().rstrip('.') for ns in nameservers})
+  }
+
+# Returns (normalised fields, None) on success, or (None, error code) on failure
 def get_whois(domain):
   try:
     w = whois.whois(domain)  # Performs a WHOIS lookup on the provided domain
-    return w                 # Returns the WHOIS data object
+    return normalise_whois(w), None
   except Exception as e:
-    return f'WHOIS lookup failed: {e}'  # Returns an error message if lookup fails
-  
-def get_dns_records(domain):
-  # A: Maps a domain name to an IPv4 address.
-  # AAAA: Maps a domain name to an IPv6 address.
-  # MX: Specifies the mail servers responsible for receiving e‑mail for the domain.
-  # NS: Lists the authoritative name servers that hold the domain’s DNS zone.
-  # TXT: Holds arbitrary text data, often used for SPF, DKIM, DMARC, and other verification records.
-  record_types = ['A', 'AAAA', 'MX', 'NS', 'TXT']  # DNS record types to query
+    return None, whois_error_code(e)  # Reports why the lookup failed
+
+# RFC 2308: a negative answer may be cached for min(SOA TTL, SOA MINIMUM) from the authority section
+def negative_ttl(response):
+  if response is not None:
+    for rrset in response.authority:
+      if rrset.rdtype == dns.rdatatype.SOA:
+        return min(rrset.ttl, rrset[0].minimum)
+  return NEGATIVE_TTL
+
+# Key for per-registry rate limiting: each TLD is served by its own registry WHOIS server
+def whois_server(domain):
+  return domain.rstrip('.').rsplit('.', 1)[-1].lower()
+
+# Everything we've already learnt, kept in SQLite so later investigations can reuse it
+class Cache:
+  def __init__(self, path=':memory:', whois_ttl=WHOIS_TTL, whois_negative_ttl=WHOIS_NEGATIVE_TTL):
+    self.whois_ttl = whois_ttl
+    self.whois_negative_ttl = whois_negative_ttl
+    self.pending = 0                        # Writes since the last commit
+    self.db = sqlite3.connect(path)
+    self.db.execute('PRAGMA journal_mode=WAL')    # Readers don't block the writer
+    self.db.execute('PRAGMA synchronous=NORMAL')  # A cache can afford to lose the last few writes
+    self.db.execute('CREATE TABLE IF NOT EXISTS dns (domain TEXT, rtype TEXT, answers TEXT, error TEXT, expires REAL, PRIMARY KEY (domain, rtype))')
+    self.db.execute('CREATE TABLE IF NOT EXISTS whois (domain TEXT PRIMARY KEY, data TEXT, expires REAL)')
+
+  # Returns (answers, error code) if a live entry exists, otherwise None
+  def get_dns(self, domain, rtype):
+    row = self.db.execute('SELECT answers, error FROM dns WHERE domain = ? AND rtype = ? AND expires > ?',
+                          (domain, rtype, time.time())).fetchone()
+    if row is None:
+      return None
+    return json.loads(row[0]), row[1]
+
+  def put_dns(self, domain, rtype, answers, error, ttl):
+    self.db.execute('INSERT OR REPLACE INTO dns VALUES (?, ?, ?, ?, ?)',
+                    (domain, rtype, json.dumps(answers), error, time.time() + ttl))
+    self._written()
+
+  # Returns (normalised fields, None) or (None, error code) if a live entry exists, otherwise None
+  def get_whois(self, domain):
+    row = self.db.execute('SELECT data FROM whois WHERE domain = ? AND expires > ?',
+                          (domain, time.time())).fetchone()
+    if row is None:
+      return None
+    data = json.loads(row[0])
+    # Errors are stored as {'error': code}; normalised fields never include that key
+    return (None, data['error']) if 'error' in data else (data, None)
+
+  # Successes keep for `whois_ttl`, definitive errors (e.g. NOTFOUND) for the shorter `whois_negative_ttl`
+  def put_whois(self, domain, data, error=None):
+    ttl = self.whois_ttl if error is None else self.whois_negative_ttl
+    self.db.execute('INSERT OR REPLACE INTO whois VALUES (?, ?, ?)',
+                    (domain, json.dumps(data if error is None else {'error': error}, default=str), time.time() + ttl))
+    self._written()
+
+  # Batches commits; one transaction per write would dominate a warm run
+  def _written(self):
+    self.pending += 1
+    if self.pending >= 500:
+      self.db.commit()
+      self.pending = 0
+
+  def close(self):
+    self.db.commit()
+    self.db.close()
+
+# Returns (record type -> answers, record type -> error code)
+async def get_dns_records(resolver, cache, domain):
   results = {}                                     # Dictionary to store results
+  errors = {}                                      # Failures, kept apart from the answers
+
+  async def query(rtype):
+    cached = cache.get_dns(domain, rtype)          # Still within its TTL? No need to ask again
+    if cached is not None:
+      answers, error = cached
+    else:
+      try:
+        answer = await resolver.resolve(domain, rtype)  # Attempts to resolve the record type
+        answers, error = [str(rdata) for rdata in answer], None  # Converts each record to string
+        cache.put_dns(domain, rtype, answers, error, answer.rrset.ttl)  # Kept for as long as the zone allows
+      except dns.resolver.NXDOMAIN as e:           # The name doesn't exist at all
+        answers, error = [], dns_error_code(e)
+        cache.put_dns(domain, rtype, answers, error, negative_ttl(next(iter(e.responses().values()), None)))
+      except dns.resolver.NoAnswer as e:           # The name exists, but has no records of this type
+        answers, error = [], dns_error_code(e)
+        cache.put_dns(domain, rtype, answers, error, negative_ttl(e.kwargs.get('response')))
+      except Exception as e:                       # Timeouts and the like are transient; never cached
+        answers, error = [], dns_error_code(e)
+    results[rtype] = answers                       # Empty list if the lookup failed
+    if error is not None:
+      errors[rtype] = error                        # Capture the error code
+
+  # All record types for the domain are in flight at once rather than one after another
+  await asyncio.gather(*(query(rtype) for rtype in RECORD_TYPES))
+  return results, errors                            # Returns all DNS results
+
+# Spaces out WHOIS submissions so registries don't rate-limit (or ban) us
+class Throttle:
+  def __init__(self, rate):
+    self.interval = 1 / rate if rate > 0 else 0  # Minimum seconds between two lookups
+    self.next_slot = 0.0                          # Earliest time the next lookup may start
+    self.lock = asyncio.Lock()                    # Serialises slot reservations
 
-  for rtype in record_types:                       # Iterates through each DNS record type
+  async def wait(self):
+    async with self.lock:
+      now = time.monotonic()
+      delay = self.next_slot - now                # How long until our slot opens
+      self.next_slot = max(now, self.next_slot) + self.interval
+    if delay > 0:
+      await asyncio.sleep(delay)                  # Sleep outside the lock so others can queue up
+
+# Running totals reported once the batch is done
+class Stats:
+  def __init__(self):
+    self.domains = 0                 # Domains fully processed
+    self.nxdomain = 0                # Domains that don't exist (counted once, not per record type)
+    self.dns_failures = Counter()    # Error code -> record-type queries that failed (NOANSWER isn't a failure)
+    self.whois_failures = Counter()  # Error code -> WHOIS lookups that failed
+    self.started = time.perf_counter()
+
+  # Tallies one finished domain's errors
+  def count(self, result):
+    self.domains += 1
+    dns_errors = [code for key, code in result.errors.items() if key != 'whois']
+    if 'NXDOMAIN' in dns_errors:
+      self.nxdomain += 1             # Every other record type fails the same way; one answer says it all
+    else:
+      self.dns_failures.update(code for code in dns_errors if code != 'NOANSWER')
+    if 'whois' in result.errors:
+      self.whois_failures[result.errors['whois']] += 1
+
+  def report(self, stream=sys.stderr):
+    elapsed = time.perf_counter() - self.started
+    rate = self.domains / elapsed if elapsed > 0 else 0.0
+    print('\n===== BATCH STATS =====', file=stream)
+    print(f'Domains:        {self.domains}', file=stream)
+    print(f'Elapsed:        {elapsed:.2f}s', file=stream)
+    print(f'Throughput:     {rate:.1f} domains/s', file=stream)
+    print(f'NXDOMAIN:       {self.nxdomain}', file=stream)
+    print(f'DNS failures:   {breakdown(self.dns_failures)}', file=stream)
+    print(f'WHOIS failures: {breakdown(self.whois_failures)}', file=stream)
+
+# `7 (TIMEOUT 5, SERVFAIL 2)`, or just `0`
+def breakdown(counter):
+  total = sum(counter.values())
+  if not total:
+    return '0'
+  return f'{total} (' + ', '.join(f'{code} {n}' for code, n in counter.most_common()) + ')'
+
+# Resolves every record type for one domain and starts its result record
+async def resolve_domain(domain, resolver, cache):
+  result = DomainResult(domain)
+  started = time.perf_counter()
+  result.records, result.errors = await get_dns_records(resolver, cache, domain)
+  result.dns_ms = round((time.perf_counter() - started) * 1000, 1)
+  return result
+
+# Copies normalised WHOIS fields onto a result
+def apply_whois(result, whois_data):
+  for name in WHOIS_FIELDS:
+    setattr(result, name, whois_data.get(name))
+  result.nameservers = result.nameservers or []
+
+# Records a WHOIS outcome, fresh or cached: its fields on success, its error code otherwise
+def record_whois(result, whois_data, error):
+  if error is None:
+    apply_whois(result, whois_data)
+  else:
+    result.errors['whois'] = error
+
+# Two stages with their own limits: `concurrency` DNS workers, and WHOIS lookups on their own
+# throttled pool. A domain whose WHOIS is still pending waits in the WHOIS backlog, so throttle
+# sleeps never hold a DNS slot; only a full backlog (`whois_backlog` domains) slows DNS down.
+async def run_batch(domains, emit, concurrency=100, whois_workers=4, whois_rate=2.0, do_whois=True, timeout=5.0,
+                    cache=None, whois_backlog=10_000):
+  loop = asyncio.get_running_loop()
+  resolver = dns.asyncresolver.Resolver()
+  resolver.lifetime = timeout            # Upper bound on each query, retries included
+  resolver.cache = dns.resolver.LRUCache()  # Shared nameserver/CNAME answers are only fetched once per run
+  cache = cache if cache is not None else Cache()  # Without a file, still dedupes within this run
+  whois_pool = ThreadPoolExecutor(max_workers=whois_workers) if do_whois else None
+  throttles = {}                         # One throttle per registry WHOIS server
+  backlog = asyncio.Semaphore(whois_backlog)  # Domains allowed to wait on WHOIS at once
+  pending = set()                        # WHOIS tasks still running
+  queue = asyncio.Queue(maxsize=concurrency * 2)  # Bounded, so the reader never races ahead
+  stats = Stats()
+
+  # Both halves are in: count it and send it on its way
+  def finish(result):
+    stats.count(result)
+    emit(result)                         # Results leave as soon as they're ready
+
+  async def lookup_whois(result):
     try:
-      answers = dns.resolver.resolve(domain, rtype)  # Attempts to resolve the record type
-      results[rtype] = [str(rdata) for rdata in answers]  # Converts each record to string
-    except Exception as e:
-      results[rtype] = []                           # If lookup fails, store an empty list
-      results[f'{rtype}_error'] = str(e)            # Capture the error message
-  
-  return results                                    # Returns all DNS results
-
-def print_output(domain, whois_data, dns_data):
+      server = whois_server(result.domain)
+      if server not in throttles:
+        throttles[server] = Throttle(whois_rate)
+      await throttles[server].wait()     # Each registry has its own pace; others aren't held up
+      started = time.perf_counter()      # Timed from the moment our slot opens
+      whois_data, error = await loop.run_in_executor(whois_pool, get_whois, result.domain)
+      result.whois_ms = round((time.perf_counter() - started) * 1000, 1)
+      if error not in TRANSIENT_WHOIS_ERRORS:  # Rate limits and network trouble are worth retrying next time
+        cache.put_whois(result.domain, whois_data, error)
+      record_whois(result, whois_data, error)
+      finish(result)
+    finally:
+      backlog.release()
+
+  async def producer():
+    for domain in domains:
+      await queue.put(domain)
+    for _ in range(concurrency):
+      await queue.put(None)              # One sentinel per worker signals the end
+
+  async def dns_worker():
+    while True:
+      domain = await queue.get()
+      if domain is None:
+        return
+      result = await resolve_domain(domain, resolver, cache)
+      if whois_pool is None:             # WHOIS can be skipped entirely for DNS-only sweeps
+        finish(result)
+        continue
+      cached = cache.get_whois(domain)
+      if cached is not None:             # Only a cache miss costs a rate-limited network round trip
+        result.whois_ms = 0.0
+        record_whois(result, *cached)
+        finish(result)
+        continue
+      await backlog.acquire()            # Hand over to the WHOIS stage and move straight on
+      task = asyncio.create_task(lookup_whois(result))
+      pending.add(task)
+      task.add_done_callback(pending.discard)
+
+  try:
+    await asyncio.gather(producer(), *(dns_worker() for _ in range(concurrency)))
+    if pending:
+      await asyncio.gather(*pending)     # Drain WHOIS lookups still in flight
+  finally:
+    if whois_pool is not None:
+      whois_pool.shutdown(wait=False)
+  return stats
+
+# Reads one domain per line, skipping blanks and `#` comments
+def read_domains(stream):
+  for line in stream:
+    domain = line.strip()
+    if domain and not domain.startswith('#'):
+      yield domain
+
+# Writes one compact JSON object per line, as each result arrives
+class JsonlWriter:
+  def __init__(self, stream):
+    self.stream = stream
+
+  def write(self, result):
+    self.stream.write(json.dumps(result.to_dict(), separators=(',', ':')) + '\n')
+
+# Writes one CSV row per result, header first
+class CsvWriter:
+  def __init__(self, stream):
+    self.writer = csv.writer(stream)
+    self.writer.writerow(CSV_HEADER)
+
+  def write(self, result):
+    self.writer.writerow(result.to_row())
+
+WRITERS = {'jsonl': JsonlWriter, 'csv': CsvWriter}
+
+# Streams results back from a JSON Lines or CSV file, one at a time
+def read_results(stream, fmt='jsonl'):
+  if fmt == 'csv':
+    reader = csv.reader(stream)
+    next(reader, None)                     # Skip the header
+    for row in reader:
+      yield DomainResult.from_row(row)
+  else:
+    for line in stream:
+      if line.strip():
+        yield DomainResult.from_dict(json.loads(line))
+
+def print_output(result):
   print('\n===== WHOIS DATA =====')   # Section header for WHOIS output
-  pprint(whois_data)                  # Pretty-prints raw WHOIS data
+  for name in WHOIS_FIELDS:           # Prints the normalised WHOIS fields
+    value = getattr(result, name)
+    print(f'{name:>16} : {", ".join(value) if isinstance(value, list) else value}')
+  if result.whois_ms is not None:
+    print(f'{"lookup time":>16} : {result.whois_ms} ms')
 
   print('\n===== DNS RECORDS =====') # Section header for DNS output
-  for rtype, records in dns_data.items():  # Iterates through DNS record results
+  for rtype in RECORD_TYPES:               # Iterates through DNS record results
+    records = result.records.get(rtype, [])
     print(f'\n{rtype} Records:')           # Prints the record type being displayed
     if records:                            # If records exist, print each one
       for r in records:
         print(f'   - {r}')
     else:
-      print('   (none found)')             # Indicates no records were found
+      print(f'   (none found: {result.errors.get(rtype, "no data")})')  # Indicates why no records were found
+  print(f'\nDNS lookup time: {result.dns_ms} ms')
+
+  if 'whois' in result.errors:
+    print(f'\nWHOIS lookup failed: {result.errors["whois"]}')
 
 def main():
   parser = argparse.ArgumentParser(description = 'Basic WHOIS + DNS Enumerator')
   # Creates a command‑line argument parser with a description
 
-  parser.add_argument('domain', help='Domain to enumerate.')
-  # Adds a required positional argument for the domain name
+  parser.add_argument('domain', nargs='?', help='Domain to enumerate.')
+  # Optional positional argument for a single domain name
+
+  parser.add_argument('-i', '--input', help='Batch mode: file of domains, one per line (`-` for stdin).')
+  parser.add_argument('-o', '--output', help='Batch mode: output file. Default: stdout.')
+  parser.add_argument('-f', '--format', choices=WRITERS, help='Batch mode: `jsonl` or `csv`. Default: from the output extension, else jsonl.')
+  parser.add_argument('-c', '--concurrency', type=int, default=100, help='Batch mode: domains in flight at once. Default: 100.')
+  parser.add_argument('--whois-workers', type=int, default=4, help='Threads dedicated to WHOIS lookups. Default: 4.')
+  parser.add_argument('--whois-rate', type=float, default=2.0, help='Maximum WHOIS lookups started per second, per registry server (0 = unlimited). Default: 2.')
+  parser.add_argument('--cache', metavar='PATH', help='Persistent DNS/WHOIS cache file, e.g. `whois-dns-cache.sqlite`. Default: in-memory for this run only.')
+  parser.add_argument('--whois-backlog', type=int, default=10_000, help='Batch mode: domains allowed to wait on WHOIS before DNS slows down. Default: 10000.')
+  parser.add_argument('--whois-ttl', type=float, default=WHOIS_TTL, help=f'Seconds a cached WHOIS record stays valid. Default: {WHOIS_TTL}.')
+  parser.add_argument('--whois-negative-ttl', type=float, default=WHOIS_NEGATIVE_TTL, help=f'Seconds a cached "no such domain" WHOIS answer stays valid. Default: {WHOIS_NEGATIVE_TTL}.')
+  parser.add_argument('--no-whois', action='store_true', help='Skip WHOIS and only resolve DNS records.')
+  parser.add_argument('--timeout', type=float, default=5.0, help='Per-query DNS lifetime in seconds. Default: 5.')
+  # Batch knobs; none of them matter for a single domain
 
   args = parser.parse_args()               # Parses command‑line arguments
+  if not args.domain and not args.input:
+    parser.error('a domain or an --input file is required')
+  # Zero workers would leave the queue unbounded and nobody to drain it: the whole input read, nothing emitted
+  for option in ('concurrency', 'whois_workers', 'whois_backlog'):
+    if getattr(args, option) < 1:
+      parser.error(f'--{option.replace("_", "-")} must be at least 1')
 
-  whois_data = get_whois(args.domain)      # Retrieves WHOIS information
-  dns_data = get_dns_records(args.domain)  # Retrieves DNS records
+  cache = Cache(args.cache or ':memory:', whois_ttl=args.whois_ttl, whois_negative_ttl=args.whois_negative_ttl)
+  options = dict(
+    whois_workers=args.whois_workers, whois_rate=args.whois_rate,
+    do_whois=not args.no_whois, timeout=args.timeout, cache=cache, whois_backlog=args.whois_backlog
+  )
 
-  print_output(args.domain, whois_data, dns_data)  # Prints all gathered information
+  # Single domain: same engine, human-readable output
+  if args.domain:
+    collected = []
+    try:
+      asyncio.run(run_batch([args.domain], collected.append, concurrency=1, **options))
+    finally:
+      cache.close()
+    print_output(collected[0])             # Prints all gathered information
+    return
+
+  # Batch: stream rows out as each domain completes, stats to stderr at the end
+  fmt = args.format or ('csv' if args.output and os.path.splitext(args.output)[1].lower() == '.csv' else 'jsonl')
+  src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+  dst = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+  try:
+    writer = WRITERS[fmt](dst)
+    stats = asyncio.run(run_batch(read_domains(src), writer.write, concurrency=args.concurrency, **options))
+  finally:
+    cache.close()
+    if src is not sys.stdin:
+      src.close()
+    if dst is not sys.stdout:
+      dst.close()
+  stats.report()
 
 if __name__ == '__main__':  # Ensures main() runs only when script is executed directly
+  # Examples to try:
+  # python whois-dns.py example.com
+  # python whois-dns.py -i domains.txt -o results.jsonl
+  # python whois-dns.py -i domains.txt --no-whois -c 500 > dns.jsonl
+  # python whois-dns.py -i domains.txt -o results.jsonl --cache whois-dns-cache.sqlite   (re-run: served from the cache)
+  # python whois-dns.py -i domains.txt -o results.csv
   main()                    # Calls the main function
@@ -0,0 +1,195 @@
+# Q-Branch performance bench.
+# Times every toolkit operation across a range of input sizes and parameters, reports
+# ops/sec, MB/s, latency percentiles and peak memory as JSON, and compares against a saved baseline.
+# Runs entirely offline: inputs are built from the bundled sample_files.
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_files')
+
+# Parameter grids for each operation
+FILE_SIZES = [1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024]  # Bytes hashed by hash_file
+MESSAGE_LENGTHS = [16, 1024, 64 * 1024, 1024 * 1024]            # Characters encrypted by aes_ed
+RSA_KEY_SIZES = [2048, 3072]                                     # Bits; rsa_ed messages stay within OAEP's limit
+BCRYPT_COSTS = [4, 8, 10, 12]                                    # Work factors for hash_pw/verify_pw
+PASSWORD_LENGTHS = [8, 16, 32, 64]                               # Characters analysed by check_strength
+
+# Cases dominated by randomness (RSA keygen searches for primes) swing far more than 10% run to run
+NOISY_CASES = ('rsa_keygen',)
+NOISY_THRESHOLD = 0.50
+
+# Human-friendly byte counts for case names
+def size_label(n):
+  for unit in ('B', 'KiB', 'MiB', 'GiB'):
+    if n < 1024 or unit == 'GiB':
+      return f'{int(n)}{unit}' if n == int(n) else f'{n:.1f}{unit}'
+    n /= 1024
+
+# Repeat (and trim) some sample data until it is exactly `size` long
+def tile(data, size):
+  return (data * (size // len(data) + 1))[:size]
+
+def percentile(sorted_values, fraction):
+  index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+  return sorted_values[index]
+
+# Time `fn` repeatedly: at least `min_runs` calls, then until `min_time` seconds have passed.
+# Peak memory comes from one extra traced call, so tracing never skews the timings.
+def measure(fn, bytes_per_op=None, min_time=0.5, min_runs=3, max_runs=10_000):
+  # Warm-up: first-call imports and caches stay out of the figures
+  fn()
+  latencies = []
+  started = time.perf_counter()
+  while len(latencies) < min_runs or (time.perf_counter() - started < min_time and len(latencies) < max_runs):
+    t0 = time.perf_counter()
+    fn()
+    latencies.append(time.perf_counter() - t0)
+  total = sum(latencies)
+
+  tracemalloc.start()
+  fn()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  latencies.sort()
+  result = {
+    'runs': len(latencies),
+    'ops_per_sec': len(latencies) / total if total > 0 else float('inf'),
+    'p50_ms': percentile(latencies, 0.50) * 1000,
+    'p90_ms': percentile(latencies, 0.90) * 1000,
+    'p99_ms': percentile(latencies, 0.99) * 1000,
+    'peak_memory_kib': peak / 1024,
+  }
+  if bytes_per_op:
+    result['mb_per_sec'] = bytes_per_op * result['ops_per_sec'] / 1e6
+  return result
+
+# Each suite yields (case name, callable, bytes per call or None)
+def hash_cases(workdir):
+  from modules.hash import hash_file
+  with open(os.path.join(SAMPLE_DIR, 'img1.png'), 'rb') as file:
+    image = file.read()
+  for size in FILE_SIZES:
+    path = os.path.join(workdir, f'hash_{size}.bin')
+    with open(path, 'wb') as file:
+      file.write(tile(image, size))
+    yield f'hash_file[size={size_label(size)}]', lambda path=path: hash_file(path), size
+
+def aes_cases(workdir):
+  from modules.encryption import aes_ed
+  with open(os.path.join(SAMPLE_DIR, 'sample.txt'), encoding='utf-8') as file:
+    text = file.read()
+  for length in MESSAGE_LENGTHS:
+    message = tile(text, length)
+    yield f'aes_ed[length={size_label(length)}]', lambda message=message: aes_ed(message), length
+
+def rsa_cases(workdir):
+  from modules.encryption import generate_rsa_key, rsa_ed
+  for bits in RSA_KEY_SIZES:
+    # Key generation is its own (slow) case; encryption then reuses the key
+    yield f'rsa_keygen[bits={bits}]', lambda bits=bits: generate_rsa_key(bits), None
+    key = generate_rsa_key(bits)
+    yield f'rsa_ed[bits={bits}]', lambda key=key: rsa_ed('Saluton, Mondo!', key), None
+
+def bcrypt_cases(workdir):
+  from modules.password import hash_pw, verify_pw
+  for cost in BCRYPT_COSTS:
+    hashed = hash_pw('Saluton, Mondo!', cost)
+    yield f'hash_pw[cost={cost}]', lambda cost=cost: hash_pw('Saluton, Mondo!', cost), None
+    yield f'verify_pw[cost={cost}]', lambda hashed=hashed: verify_pw('Saluton, Mondo!', hashed), None
+
+def strength_cases(workdir):
+  from modules.password import check_strength
+  with open(os.path.join(SAMPLE_DIR, 'sample.txt'), encoding='utf-8') as file:
+    text = ''.join(file.read().split())
+  for length in PASSWORD_LENGTHS:
+    password = tile(text, length)
+    yield f'check_strength[length={length}]', lambda password=password: check_strength(password), None
+
+SUITES = {'hash': hash_cases, 'aes': aes_cases, 'rsa': rsa_cases, 'bcrypt': bcrypt_cases, 'strength': strength_cases}
+
+def run(suites, min_time, progress=sys.stderr):
+  results = {}
+  with tempfile.TemporaryDirectory() as workdir:
+    for suite in suites:
+      for name, fn, bytes_per_op in SUITES[suite](workdir):
+        results[name] = measure(fn, bytes_per_op, min_time)
+        print(f'{name:<32} {results[name]["ops_per_sec"]:>12.1f} ops/s  p50 {results[name]["p50_ms"]:>10.3f} ms',
+              file=progress)
+  return {
+    'meta': {
+      'timestamp': datetime.now(timezone.utc).isoformat(),
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'cpu_count': os.cpu_count(),
+      # tracemalloc only sees Python's allocator; OpenSSL and bcrypt allocate natively, out of its sight
+      'peak_memory_note': 'peak_memory_kib is from tracemalloc and excludes native (OpenSSL, bcrypt) allocations',
+    },
+    'results': results,
+  }
+
+# Cases whose median latency grew more than `threshold` (a fraction) over the baseline's.
+# The median shrugs off the stalls that swing a mean; NOISY_CASES get the wider `noisy_threshold`.
+# Returns (name, baseline p50 ms, current p50 ms, change) for each regression.
+def compare(report, baseline, threshold, noisy_threshold=NOISY_THRESHOLD):
+  regressions = []
+  for name, current in report['results'].items():
+    before = baseline['results'].get(name)
+    if before is None:
+      continue
+    # A case too fast for the clock to register has no meaningful ratio
+    if not all(0 < value < math.inf for value in (before['p50_ms'], current['p50_ms'])):
+      continue
+    limit = noisy_threshold if name.startswith(NOISY_CASES) else threshold
+    change = current['p50_ms'] / before['p50_ms'] - 1
+    if change > limit:
+      regressions.append((name, before['p50_ms'], current['p50_ms'], change))
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the Q-Cryptography Toolkit.')
+  parser.add_argument('-s', '--suites', default=','.join(SUITES), help=f'Comma-separated subset of: {", ".join(SUITES)}. Default: all.')
+  parser.add_argument('-o', '--output', help='Write the JSON report here. Default: stdout.')
+  parser.add_argument('--min-time', type=float, default=0.5, help='Seconds spent timing each case. Default: 0.5.')
+  parser.add_argument('--baseline', help='Earlier JSON report to compare against.')
+  parser.add_argument('--threshold', type=float, default=0.10, help='Growth in median latency (a fraction) counted as a regression. Default: 0.10.')
+  parser.add_argument('--noisy-threshold', type=float, default=NOISY_THRESHOLD, help=f'The same, for inherently noisy cases ({", ".join(NOISY_CASES)}). Default: {NOISY_THRESHOLD:.2f}.')
+  args = parser.parse_args()
+
+  suites = args.suites.split(',')
+  unknown = set(suites) - set(SUITES)
+  if unknown:
+    parser.error(f'unknown suite(s): {", ".join(sorted(unknown))}')
+
+  report = run(suites, args.min_time)
+  if args.output:
+    with open(args.output, 'w', encoding='utf-8') as file:
+      json.dump(report, file, indent=2)
+  else:
+    print(json.dumps(report, indent=2))
+
+  if args.baseline:
+    with open(args.baseline, encoding='utf-8') as file:
+      regressions = compare(report, json.load(file), args.threshold, args.noisy_threshold)
+    for name, before, after, change in regressions:
+      print(f'REGRESSION {name}: p50 {before:.3f} -> {after:.3f} ms ({change:+.1%})', file=sys.stderr)
+    if regressions:
+      return 1
+    print(f'No regressions beyond {args.threshold:.0%}.', file=sys.stderr)
+  return 0
+
+if __name__ == '__main__':
+  # Examples to try:
+  # python benchmark.py -o baseline.json
+  # python benchmark.py --baseline baseline.json --threshold 0.15 -o current.json
+  # python benchmark.py -s hash,aes --min-time 0.2
+  sys.exit(main())
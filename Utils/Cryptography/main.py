@@ -2,13 +2,26 @@
 # This is our field toolkit for agents in need of digital secrecy.
 # Think of it as your personal issue from Q's lab: practical, clever, and just a bit theatrical.
 
-# Import cryptographic and utility modules from our own arsenal
-from modules.hash import hash_file, verify_integrity
-from modules.encryption import aes_ed, rsa_ed
-from modules.password import check_strength, hash_pw, verify_pw
-from modules.ansicolours import colour_text, RED
+# Start the stopwatch before anything else is loaded, so `--timing` can report cold-start cost
+import time
+STARTED = time.perf_counter()
+
+import argparse
+import os
+import sys
 from getpass import getpass
 
+# Only the lightweight colour helpers are imported up front. The modules behind each operation
+# pull in cryptography, bcrypt or zxcvbn, so they are imported inside the operation that needs them.
+from modules.ansicolours import colour_text, RED, GREEN
+
+# Third-party packages whose presence in sys.modules `--timing` reports
+HEAVY_MODULES = ('cryptography', 'bcrypt', 'zxcvbn')
+
+# Private-key passphrases are never taken on the command line (argv is visible to every user).
+# Scripts can set this variable; otherwise the passphrase is prompted for.
+KEY_PASSWORD_ENV = 'Q_KEY_PASSWORD'
+
 # Present the agent with a menu of available operations
 def menu():
   print('\nSelect Operation:')
@@ -20,7 +33,7 @@ def menu():
   print('6. Exit\n')
 
 # Main mission briefing and control loop
-def main():
+def interactive():
   # Greetings from Q-Branch, setting the scene for the agent
   print('''
 Initialising Q-Cryptography Toolkit v1.0...
@@ -32,7 +45,7 @@ Initialising Q-Cryptography Toolkit v1.0...
 
 All systems online. Data protection protocols active.
 Prepare to enter the world of digital secrecy!''')
-  
+
   # Continuous loop until agent chooses to exit
   while True:
     menu()
@@ -41,15 +54,18 @@ Prepare to enter the world of digital secrecy!''')
 
     # Hashing a file to produce its SHA-256 fingerprint
     if choice == '1':
+      from modules.hash import hash_file
       file_path = input('Enter file path: ')
       print(f'\nSHA Hash of the file is: {hash_file(file_path)}')
     # Comparing two files to check for tampering
     elif choice == '2':
+      from modules.hash import verify_integrity
       file_path1 = input('Enter file path 1: ')
       file_path2 = input('Enter file path 2: ')
       print(verify_integrity(file_path1, file_path2))
     # AES symmetric encryption demonstration
     elif choice == '3':
+      from modules.encryption import aes_ed
       message = input('Enter your message: ')
       key, ciphertext, plaintext = aes_ed(message)
       print(f'AES Key: {key}')
@@ -57,26 +73,28 @@ Prepare to enter the world of digital secrecy!''')
       print(f'AES Plaintext: {plaintext}')
     # RSA asymmetric encryption demonstration
     elif choice == '4':
+      from modules.encryption import rsa_ed
       message = input('Enter your message: ')
       ciphertext, plaintext = rsa_ed(message)
       print(f'RSA message, encrypted with a public key: {ciphertext}')
       print(f'RSA message, decrypted with a private key: {plaintext}')
     # Password strength assessment and verification
     elif choice == '5':
+      from modules.password import check_strength, hash_pw, verify_pw
       while True:
         password = getpass('Enter a password to check strength: ')
         result = check_strength(password) # Nicely shaken, not stirred?
         print(result)
-        
+
         # Q would frown upon weak passwords; insist on stronger ones
         if result.startswith(f'{colour_text("Weak", RED)}'):
           # I take a ridiculous pleasure in crafting my passwords.
           # It's very pernickety and old-maidish really,
-          # but it makes them more interesting when one takes trouble. 
+          # but it makes them more interesting when one takes trouble.
           print('Please choose a stronger password.')
         else:
           break
-      
+
       # Hash the password for storage (bcrypt)
       hashed_pw = hash_pw(password)
       print(f'Hashed password: {hashed_pw}')
@@ -92,7 +110,249 @@ Prepare to enter the world of digital secrecy!''')
   # Final farewell from Q-Branch; mission complete
   print('\nAgent, you are exiting your Q-Cryptography Toolkit. Stay sharp and secure out there!')
 
+# Text input from a file, or stdin for `-`
+def open_text(path):
+  return sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+
+# Subcommands
+# One digest line per file and algorithm, in the familiar `sha256sum` layout.
+# Like sha256sum, unreadable files are reported on stderr, the rest still hashed, and the exit status is 1.
+def cmd_hash(args):
+  from modules.hash import hash_files
+  algorithms = args.algorithms.split(',')
+  failures = 0
+  for path, digests in hash_files(args.files, algorithms, args.workers, use_mmap=args.mmap):
+    if isinstance(digests, OSError):
+      failures += 1
+      print(f'hash: {path}: {digests.strerror or digests}', file=sys.stderr)
+      continue
+    for algorithm, digest in digests.items():
+      print(f'{digest}  {path}' if len(algorithms) == 1 else f'{algorithm}  {digest}  {path}')
+  return 1 if failures else 0
+
+# Compare two files, or a directory tree against a saved manifest
+def cmd_verify(args):
+  if args.manifest:
+    from modules.hash import HashCache, load_manifest, verify_manifest
+    cache = HashCache(args.cache)
+    failures = 0
+    for relpath, status in verify_manifest(args.paths[0], load_manifest(args.manifest), args.workers, cache):
+      failures += status != 'ok'
+      print(f'{colour_text(status.upper().ljust(8), GREEN if status == "ok" else RED)}  {relpath}')
+    cache.save()
+    return 1 if failures else 0
+  if len(args.paths) != 2:
+    sys.exit('verify: give two files, or a directory and --manifest')
+  from modules.hash import verify_integrity
+  result = verify_integrity(*args.paths)
+  print(result)
+  return 0 if 'File INTACT' in result else 1
+
+# Baseline a directory tree
+def cmd_manifest(args):
+  from modules.hash import HashCache, build_manifest, save_manifest
+  cache = HashCache(args.cache)
+  manifest = build_manifest(args.root, args.algorithm, args.workers, cache)
+  save_manifest(manifest, args.output)
+  cache.save()
+  print(f'{len(manifest["files"])} files written to {args.output}')
+
+# Build a block-level fingerprint, or check a file against the one stored beside it
+def cmd_merkle(args):
+  from modules.hash import CHUNK_SIZE, build_merkle, save_merkle, verify_merkle
+  if args.check:
+    ranges = [tuple(int(n) for n in r.split(':')) for r in args.range] or None
+    try:
+      changed = verify_merkle(args.file, ranges=ranges, workers=args.workers, modified_only=args.modified_only)
+    except ValueError as e:
+      sys.exit(f'merkle: {e}')
+    print(f'{colour_text("CHANGED", RED)} blocks: {changed}' if changed else colour_text('INTACT', GREEN))
+    return 1 if changed else 0
+  tree = build_merkle(args.file, args.chunk_size or CHUNK_SIZE, workers=args.workers)
+  save_merkle(args.file, tree)
+  print(f'{tree["root"]}  {args.file} ({len(tree["leaves"])} blocks)')
+
+# The private-key passphrase from $Q_KEY_PASSWORD, or typed (twice, with `confirm`) at the prompt
+def key_password(prompt, confirm=False):
+  password = os.environ.get(KEY_PASSWORD_ENV)
+  if password is not None:
+    return password
+  password = getpass(prompt)
+  if confirm and getpass('Repeat the passphrase: ') != password:
+    sys.exit('Passphrases do not match.')
+  return password
+
+# A raw AES key (hex) with --aes, otherwise an RSA key pair at OUT and OUT.pub
+def cmd_keygen(args):
+  if args.aes:
+    import secrets
+    from modules.encryption import open_private
+    with open_private(args.output, 'w') as file:
+      file.write(secrets.token_bytes(32).hex())
+    return
+  from modules.encryption import generate_rsa_key, save_private_key, save_public_key
+  password = key_password('Passphrase for the private key: ', confirm=True) if args.protect else None
+  private_key = generate_rsa_key(args.bits)
+  save_private_key(private_key, args.output, password)
+  save_public_key(private_key.public_key(), args.output + '.pub')
+
+def read_aes_key(path):
+  with open(path) as file:
+    return bytes.fromhex(file.read().strip())
+
+# Stream a file through AES-GCM with a shared key, or to an RSA recipient via the hybrid envelope
+def cmd_encrypt(args):
+  from modules import encryption
+  if args.recipient:
+    encryption.hybrid_encrypt_file(encryption.load_public_key(args.recipient), args.input, args.output, args.workers)
+  else:
+    encryption.encrypt_file(read_aes_key(args.key), args.input, args.output, workers=args.workers)
+
+def cmd_decrypt(args):
+  from modules import encryption
+  if args.identity:
+    # Try without a passphrase first: cryptography rejects one given for an unencrypted key, so
+    # $Q_KEY_PASSWORD (perhaps set for other keys) is only consulted once the key turns out to need it
+    try:
+      private_key = encryption.load_private_key(args.identity)
+    # cryptography raises TypeError when the key is encrypted but no passphrase was given
+    except TypeError:
+      try:
+        private_key = encryption.load_private_key(args.identity, key_password(f'Passphrase for {args.identity}: '))
+      except ValueError as e:
+        sys.exit(f'decrypt: cannot load {args.identity}: {e}')
+    encryption.hybrid_decrypt_file(private_key, args.input, args.output, args.workers)
+  else:
+    encryption.decrypt_file(read_aes_key(args.key), args.input, args.output, args.workers)
+
+# Audit a wordlist or dump, or check a single password typed at the prompt
+def cmd_pwcheck(args):
+  from modules import password
+  if args.input is None:
+    print(password.check_strength(getpass('Enter a password to check strength: ')))
+    return
+  out = open(args.output, 'w', encoding='utf-8') if args.output else None
+  try:
+    with open_text(args.input) as lines:
+      summary = password.audit_passwords(lines, out, args.separator, args.max_length, workers=args.workers)
+  finally:
+    if out:
+      out.close()
+  password.print_histogram(summary)
+
+# Hash passwords (one per line) in batch, or calibrate the bcrypt cost for this host
+def cmd_pwhash(args):
+  from modules import password
+  if args.calibrate:
+    rounds, timings = password.calibrate_cost(args.calibrate)
+    for cost, ms in timings.items():
+      print(f'cost {cost:>2}: {ms:8.1f} ms')
+    print(f'Recommended cost: {rounds}')
+    return
+  if args.input is None:
+    print(password.hash_pw(getpass('Enter a password to hash: '), args.rounds).decode())
+    return
+  with open_text(args.input) as lines:
+    entries = [line.rstrip('\r\n') for line in lines if line.strip()]
+  hashes, metrics = password.hash_many(entries, args.rounds, args.workers, password.print_progress)
+  for hashed in hashes:
+    print(hashed.decode())
+  print(f'{metrics["count"]} hashed in {metrics["seconds"]:.1f}s ({metrics["per_second"]:.1f}/s)', file=sys.stderr)
+  if metrics['truncated']:
+    print(f'{metrics["truncated"]} longer than {password.MAX_PASSWORD_BYTES} bytes; bcrypt hashed only their first {password.MAX_PASSWORD_BYTES}.', file=sys.stderr)
+
+def build_parser():
+  parser = argparse.ArgumentParser(description='Q-Cryptography Toolkit. Run without a command for the interactive menu.')
+  parser.add_argument('--timing', action='store_true', help='Report start-up time, run time and which heavy modules were loaded.')
+  commands = parser.add_subparsers(dest='command')
+
+  p = commands.add_parser('hash', help='Hash one or more files.')
+  p.add_argument('files', nargs='+')
+  p.add_argument('-a', '--algorithms', default='sha256', help='Comma-separated, e.g. sha256,sha1,md5,blake2b. Default: sha256.')
+  p.add_argument('-w', '--workers', type=int, help='Files hashed in parallel. Default: one per core (plus a few).')
+  p.add_argument('--mmap', action='store_true', help='Read through a memory map instead of a buffer.')
+  p.set_defaults(func=cmd_hash)
+
+  p = commands.add_parser('verify', help='Compare two files, or a directory against a manifest.')
+  p.add_argument('paths', nargs='+')
+  p.add_argument('-m', '--manifest', help='Manifest to check the directory against.')
+  p.add_argument('--cache', help='Hash cache file, so unchanged files are not re-read.')
+  p.add_argument('-w', '--workers', type=int)
+  p.set_defaults(func=cmd_verify)
+
+  p = commands.add_parser('manifest', help='Write a manifest of every file under a directory.')
+  p.add_argument('root')
+  p.add_argument('-o', '--output', default='manifest.json', help='Default: `manifest.json`.')
+  p.add_argument('-a', '--algorithm', default='sha256')
+  p.add_argument('--cache', help='Hash cache file, so unchanged files are not re-read.')
+  p.add_argument('-w', '--workers', type=int)
+  p.set_defaults(func=cmd_manifest)
+
+  p = commands.add_parser('merkle', help='Build (or --check) a block-level fingerprint stored beside the file.')
+  p.add_argument('file')
+  p.add_argument('--check', action='store_true', help='Report which blocks changed since the fingerprint was built.')
+  p.add_argument('--range', action='append', default=[], help='START:END byte range to re-check (repeatable).')
+  p.add_argument('--modified-only', action='store_true', help='With --check, skip a file whose size and mtime are unchanged since the fingerprint.')
+  p.add_argument('--chunk-size', type=int, help='Block size in bytes. Default: 4 MiB.')
+  p.add_argument('-w', '--workers', type=int)
+  p.set_defaults(func=cmd_merkle)
+
+  p = commands.add_parser('keygen', help='Generate an RSA key pair (OUT, OUT.pub) or, with --aes, an AES key.')
+  p.add_argument('output')
+  p.add_argument('--aes', action='store_true', help='Write a random 256-bit AES key as hex.')
+  p.add_argument('--bits', type=int, default=2048, help='RSA key size. Default: 2048.')
+  p.add_argument('--protect', action='store_true', help=f'Encrypt the private key at rest with a passphrase (prompted, or ${KEY_PASSWORD_ENV}).')
+  p.set_defaults(func=cmd_keygen)
+
+  for name, func in (('encrypt', cmd_encrypt), ('decrypt', cmd_decrypt)):
+    p = commands.add_parser(name, help=f'{name.capitalize()} a file with streaming AES-GCM.')
+    p.add_argument('input')
+    p.add_argument('output')
+    keys = p.add_mutually_exclusive_group(required=True)
+    keys.add_argument('-k', '--key', help='AES key file (hex), as written by `keygen --aes`.')
+    if name == 'encrypt':
+      keys.add_argument('-r', '--recipient', help='RSA public key (PEM) to encrypt to.')
+    else:
+      keys.add_argument('-i', '--identity', help=f'RSA private key (PEM) to decrypt with. Prompts for its passphrase (or reads ${KEY_PASSWORD_ENV}) if it has one.')
+    p.add_argument('-w', '--workers', type=int, default=1, help='Segments processed in parallel. Default: 1.')
+    p.set_defaults(func=func)
+
+  p = commands.add_parser('pwcheck', help='Check a password, or audit a wordlist/dump (`-` for stdin).')
+  p.add_argument('input', nargs='?')
+  p.add_argument('-o', '--output', help='Per-entry JSON Lines report.')
+  p.add_argument('-s', '--separator', help='Split `user<separator>password` lines, e.g. `:`.')
+  p.add_argument('--max-length', type=int, default=64, help='Characters analysed per password. Default: 64.')
+  p.add_argument('-w', '--workers', type=int)
+  p.set_defaults(func=cmd_pwcheck)
+
+  p = commands.add_parser('pwhash', help='bcrypt-hash a password, or a file of them (`-` for stdin).')
+  p.add_argument('input', nargs='?')
+  p.add_argument('-r', '--rounds', type=int, default=12, help='bcrypt cost. Default: 12.')
+  p.add_argument('--calibrate', type=float, metavar='MS', help='Find the highest cost that hashes within MS milliseconds here.')
+  p.add_argument('-w', '--workers', type=int)
+  p.set_defaults(func=cmd_pwhash)
+
+  return parser
+
+def main():
+  args = build_parser().parse_args()
+  ready = time.perf_counter()
+
+  # No subcommand: the classic interactive menu
+  status = args.func(args) if args.command else interactive()
+
+  if args.timing:
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules] or ['none']
+    print(f'\nStart-up: {(ready - STARTED) * 1000:.1f} ms, run: {(time.perf_counter() - ready) * 1000:.1f} ms, '
+          f'heavy modules loaded: {", ".join(loaded)}', file=sys.stderr)
+  return status
 
 # Entry point; launch the toolkit when run directly
 if __name__ == '__main__':
-  main()
+  # Examples to try:
+  # python main.py --timing hash sample_files/sample.txt
+  # python main.py hash -a sha256,md5 sample_files/*.png
+  # python main.py manifest sample_files -o manifest.json && python main.py verify sample_files -m manifest.json
+  # python main.py keygen agent.pem && python main.py encrypt secret.bin secret.enc -r agent.pem.pub
+  # python main.py pwcheck rockyou.txt -o audit.jsonl
+  sys.exit(main())
@@ -1,11 +1,24 @@
 # Cryptographically secure randomness for keys and nonces
 import secrets # Like random, but more secure
+# Key file paths and modification times for the key cache
+import os
+# In-memory streams and timing for the streaming benchmark
+import io
+import time
+# Decrypted output goes to a temporary file that only replaces the target on success
+import tempfile
+from contextlib import contextmanager
+# Bounded window of in-flight segments for parallel streaming
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 # Authenticated encryption with associated data (AEAD) via AES-GCM
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 # RSA primitives and OAEP padding for secure asymmetric operations
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-# Hash functions used within OAEP (SHA-256)
-from cryptography.hazmat.primitives import hashes
+# Hash functions used within OAEP (SHA-256), and PEM (de)serialisation for persisted keys
+from cryptography.hazmat.primitives import hashes, serialization
+# Per-stream subkeys for streaming encryption
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 # Symmetric Encryption
 # Encrypts and decrypts a message using AES-GCM; returns key, ciphertext, and recovered plaintext
@@ -25,38 +38,294 @@ def aes_ed(message):
   # Hex-encode key and ciphertext for display; decode plaintext to text
   return key.hex(), ciphertext.hex(), plaintext.decode()
 
+# Streaming Encryption
+# Files and pipes are split into fixed-size segments, each sealed with AES-GCM on its own.
+# Stream layout: header | segment 0 | segment 1 | ... | final segment
+#   header  = magic (4) | segment size (4, big-endian) | random salt (32) | random nonce prefix (7)
+#   subkey  = HKDF-SHA256(key, salt, info = magic + segment size)
+#   nonce_i = nonce prefix (7) | counter i (4, big-endian) | 0x01 on the final segment, else 0x00 (1)
+# Segments are sealed under the subkey, never the long-lived key itself, so reusing one key for many
+# streams (as `keygen --aes` invites) doesn't rest on random nonce prefixes never colliding.
+# The header is the associated data of every segment, and the final-segment flag is part of the nonce,
+# so segments cannot be reordered, dropped, or truncated away without decryption failing.
+STREAM_MAGIC = b'QAE2'
+SEGMENT_SIZE = 1024 * 1024                  # 1 MiB of plaintext per segment
+MAX_SEGMENT_SIZE = 64 * 1024 * 1024         # Upper bound accepted when decrypting
+SALT_SIZE = 32
+HEADER_SIZE = len(STREAM_MAGIC) + 4 + SALT_SIZE + 7
+TAG_SIZE = 16                               # AES-GCM authentication tag appended to each segment
+
+# Read exactly `size` bytes unless the stream ends first; pipes may hand back less per read
+def _read_exact(src, size):
+  chunks = []
+  while size:
+    chunk = src.read(size)
+    if not chunk:
+      break
+    chunks.append(chunk)
+    size -= len(chunk)
+  return b''.join(chunks)
+
+# Yield (index, segment, is_final) from a stream, reading one segment ahead to spot the last one
+def _segments(src, size):
+  current = _read_exact(src, size)
+  index = 0
+  while True:
+    following = _read_exact(src, size) if len(current) == size else b''
+    if index >= 2 ** 32:
+      raise ValueError('Stream too long for a 32-bit segment counter')
+    yield index, current, not following
+    if not following:
+      return
+    current, index = following, index + 1
+
+# The AES-GCM instance for one stream, keyed with a subkey derived from its header
+def _stream_cipher(key, header):
+  salt = header[8:8 + SALT_SIZE]
+  subkey = HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=header[:8]).derive(key)
+  return AESGCM(subkey)
+
+def _segment_nonce(prefix, index, final):
+  return prefix + index.to_bytes(4, 'big') + (b'\x01' if final else b'\x00')
+
+# Apply `transform` to each segment, optionally on a thread pool.
+# At most 2 * workers segments are held at once, so memory stays constant whatever the stream length.
+def _pipeline(segments, transform, workers):
+  if workers <= 1:
+    for segment in segments:
+      yield transform(*segment)
+    return
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    window = deque()
+    for segment in segments:
+      window.append(pool.submit(transform, *segment))
+      if len(window) >= workers * 2:
+        yield window.popleft().result()
+    while window:
+      yield window.popleft().result()
+
+# Encrypt everything readable from `src` into `dst` with a 256-bit key; returns bytes written
+def encrypt_stream(key, src, dst, segment_size=SEGMENT_SIZE, workers=1):
+  # The same bounds decrypt_stream() enforces; 0 would silently drop every byte of input
+  if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+    raise ValueError(f'Unsupported segment size: {segment_size}')
+  # A fresh salt per stream gives it its own subkey; the random prefix is a second line of defence
+  header = STREAM_MAGIC + segment_size.to_bytes(4, 'big') + secrets.token_bytes(SALT_SIZE) + secrets.token_bytes(7)
+  aes = _stream_cipher(key, header)
+  prefix = header[-7:]
+  dst.write(header)
+  written = len(header)
+
+  def seal(index, segment, final):
+    return aes.encrypt(_segment_nonce(prefix, index, final), segment, header)
+
+  for sealed in _pipeline(_segments(src, segment_size), seal, workers):
+    dst.write(sealed)
+    written += len(sealed)
+  return written
+
+# Decrypt a stream produced by encrypt_stream(); raises InvalidTag on any tampering or truncation
+def decrypt_stream(key, src, dst, workers=1):
+  header = _read_exact(src, HEADER_SIZE)
+  if len(header) != HEADER_SIZE or not header.startswith(STREAM_MAGIC):
+    raise ValueError('Not an encrypted stream (bad header)')
+  segment_size = int.from_bytes(header[4:8], 'big')
+  # Refuse absurd sizes from a forged header rather than trying to buffer them
+  if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+    raise ValueError(f'Unsupported segment size: {segment_size}')
+  aes = _stream_cipher(key, header)
+  prefix = header[-7:]
+
+  def open_segment(index, segment, final):
+    return aes.decrypt(_segment_nonce(prefix, index, final), segment, header)
+
+  written = 0
+  for plain in _pipeline(_segments(src, segment_size + TAG_SIZE), open_segment, workers):
+    dst.write(plain)
+    written += len(plain)
+  return written
+
+# File-to-file wrappers around the stream functions
+def encrypt_file(key, in_path, out_path, segment_size=SEGMENT_SIZE, workers=1):
+  with open(in_path, 'rb') as src, open(out_path, 'wb') as dst:
+    return encrypt_stream(key, src, dst, segment_size, workers)
+
+# Write to a temporary file beside `out_path`, moved into place only if the block completes.
+# A failed decryption therefore never leaves unauthenticated plaintext behind.
+# mkstemp() creates the file owner-only, and the rename replaces any existing file (and its mode) outright.
+@contextmanager
+def _replace_on_success(out_path, mode='wb'):
+  fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(out_path)), suffix='.part')
+  try:
+    with os.fdopen(fd, mode) as dst:
+      yield dst
+    os.replace(temp_path, out_path)
+  except BaseException:
+    os.remove(temp_path)
+    raise
+
+def decrypt_file(key, in_path, out_path, workers=1):
+  with open(in_path, 'rb') as src, _replace_on_success(out_path) as dst:
+    return decrypt_stream(key, src, dst, workers)
+
+# Discards whatever is written to it, so the benchmark measures crypto rather than the disk
+class _NullSink:
+  def write(self, data):
+    return len(data)
+
+# Measure streaming encryption/decryption throughput (MB/s) for a range of worker counts
+def benchmark_stream(size=64 * 1024 * 1024, segment_size=SEGMENT_SIZE, worker_counts=(1, 2, 4)):
+  key = secrets.token_bytes(32)
+  plaintext = secrets.token_bytes(size)
+  ciphertext = io.BytesIO()
+  encrypt_stream(key, io.BytesIO(plaintext), ciphertext, segment_size)
+  results = {}
+  for workers in worker_counts:
+    started = time.perf_counter()
+    encrypt_stream(key, io.BytesIO(plaintext), _NullSink(), segment_size, workers)
+    results[f'encrypt, {workers} worker(s)'] = size / (time.perf_counter() - started) / 1e6
+    started = time.perf_counter()
+    decrypt_stream(key, io.BytesIO(ciphertext.getvalue()), _NullSink(), workers)
+    results[f'decrypt, {workers} worker(s)'] = size / (time.perf_counter() - started) / 1e6
+  return results
+
 # Asymmetric Encryption
-# Demonstrates RSA encryption/decryption with OAEP; generates ephemeral keys per call
-def rsa_ed(message):
-  # Generate a fresh RSA private key (2048-bit) with standard public exponent
-  private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+# RSA-OAEP with SHA-256 for both MGF1 and hash; built once and shared by every RSA operation
+OAEP = padding.OAEP( # Optimal asymmetric encryption padding
+  mgf=padding.MGF1(algorithm=hashes.SHA256()), # Mask generation function
+  algorithm=hashes.SHA256(),
+  label=None
+)
+
+# Key Management
+# Generating an RSA key costs tens to hundreds of milliseconds, so do it once and keep the result
+def generate_rsa_key(key_size=2048):
+  # Standard public exponent
+  return rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+
+# Write a private key as PKCS#8 PEM, encrypted at rest if a password is given
+def save_private_key(private_key, path, password=None):
+  encryption = serialization.BestAvailableEncryption(password.encode()) if password else serialization.NoEncryption()
+  pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption)
+  with open_private(path) as file:
+    file.write(pem)
+
+# Write key material to a file readable and writable by its owner alone.
+# Unlike open() (which honours the umask) or os.open(..., 0o600) (whose mode only applies to a new file),
+# this also holds when overwriting an existing, world-readable file: a fresh owner-only file replaces it.
+def open_private(path, mode='wb'):
+  return _replace_on_success(path, mode)
+
+# Write the public half as SubjectPublicKeyInfo PEM, safe to hand to anyone
+def save_public_key(public_key, path):
+  pem = public_key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+  with open(path, 'wb') as file:
+    file.write(pem)
+
+# Process-wide cache of loaded keys: (absolute path, mtime, password) -> key object.
+# A key file that is rewritten gets a new mtime, and so is loaded afresh.
+_key_cache = {}
+
+def _load_key(path, loader, password=None):
+  cache_key = (os.path.abspath(path), os.stat(path).st_mtime_ns, password)
+  if cache_key not in _key_cache:
+    with open(path, 'rb') as file:
+      _key_cache[cache_key] = loader(file.read())
+  return _key_cache[cache_key]
+
+def load_private_key(path, password=None):
+  return _load_key(path, lambda pem: serialization.load_pem_private_key(pem, password.encode() if password else None), password)
+
+def load_public_key(path):
+  return _load_key(path, serialization.load_pem_public_key)
+
+# One key per process for rsa_ed() and the demo, generated on first use
+_default_key = None
+
+def default_rsa_key():
+  global _default_key
+  if _default_key is None:
+    _default_key = generate_rsa_key()
+  return _default_key
+
+# Demonstrates RSA encryption/decryption with OAEP; reuses one key per process unless given another
+def rsa_ed(message, private_key=None):
+  # Reuse the given (or process-wide) RSA private key rather than generating a fresh one per call
+  private_key = private_key or default_rsa_key()
   # Derive the corresponding public key for encryption
   public_key = private_key.public_key()
 
-  # Encrypt the message using RSA-OAEP with SHA-256 for both MGF1 and hash
-  ciphertext = public_key.encrypt(
-    message.encode(),
-    padding.OAEP( # Optimal asymmetric encryption padding
-      mgf=padding.MGF1(algorithm=hashes.SHA256()), # Mask generation function
-      algorithm=hashes.SHA256(),
-      label=None
-    )
-  )
+  # Encrypt the message using RSA-OAEP
+  ciphertext = public_key.encrypt(message.encode(), OAEP)
 
   # Decrypt the ciphertext using the private key and matching OAEP parameters
-  plaintext = private_key.decrypt(
-    ciphertext,
-    padding.OAEP( # Optimal asymmetric encryption padding
-      mgf=padding.MGF1(algorithm=hashes.SHA256()), # Mask generation function
-      algorithm=hashes.SHA256(),
-      label=None
-    )
-  )
+  plaintext = private_key.decrypt(ciphertext, OAEP)
 
   # Return hex-encoded ciphertext and decoded plaintext for readability
   return ciphertext.hex(), plaintext.decode()
 
+# Hybrid Encryption
+# RSA-OAEP only fits ~190 bytes, so it wraps a fresh AES-256 key and AES-GCM carries the payload.
+# Message envelope: magic (4) | wrapped key length (2, big-endian) | wrapped key | nonce (12) | AES-GCM ciphertext
+# File envelope:    magic (4) | wrapped key length (2, big-endian) | wrapped key | encrypt_stream() output
+# Everything before the nonce is authenticated as associated data.
+HYBRID_MAGIC = b'QHE1'
+HYBRID_FILE_MAGIC = b'QHF1'
+
+def _wrap_key(public_key, magic):
+  key = secrets.token_bytes(32)
+  wrapped = public_key.encrypt(key, OAEP)
+  return key, magic + len(wrapped).to_bytes(2, 'big') + wrapped
+
+def _read_envelope_header(read, magic):
+  if read(4) != magic:
+    raise ValueError('Not a hybrid envelope (bad magic)')
+  length = read(2)
+  wrapped = read(int.from_bytes(length, 'big'))
+  return wrapped, magic + length + wrapped
+
+# Encrypt bytes of any length to the holder of `public_key`
+def hybrid_encrypt(public_key, data):
+  key, header = _wrap_key(public_key, HYBRID_MAGIC)
+  nonce = secrets.token_bytes(12)
+  return header + nonce + AESGCM(key).encrypt(nonce, data, header)
+
+def hybrid_decrypt(private_key, envelope):
+  view = io.BytesIO(envelope)
+  wrapped, header = _read_envelope_header(view.read, HYBRID_MAGIC)
+  key = private_key.decrypt(wrapped, OAEP)
+  nonce = view.read(12)
+  return AESGCM(key).decrypt(nonce, view.read(), header)
+
+# Batch helpers: the key is loaded once, each message only costs one RSA public operation plus AES
+def hybrid_encrypt_many(public_key, messages):
+  for data in messages:
+    yield hybrid_encrypt(public_key, data)
+
+def hybrid_decrypt_many(private_key, envelopes):
+  for envelope in envelopes:
+    yield hybrid_decrypt(private_key, envelope)
+
+# Encrypt a file of any size to a recipient, streaming it through encrypt_stream()
+def hybrid_encrypt_file(public_key, in_path, out_path, workers=1):
+  key, header = _wrap_key(public_key, HYBRID_FILE_MAGIC)
+  with open(in_path, 'rb') as src, open(out_path, 'wb') as dst:
+    dst.write(header)
+    return len(header) + encrypt_stream(key, src, dst, workers=workers)
+
+def hybrid_decrypt_file(private_key, in_path, out_path, workers=1):
+  with open(in_path, 'rb') as src, _replace_on_success(out_path) as dst:
+    wrapped, _ = _read_envelope_header(src.read, HYBRID_FILE_MAGIC)
+    return decrypt_stream(private_key.decrypt(wrapped, OAEP), src, dst, workers)
+
 # Simple self-test: exercise both AES and RSA paths with a sample message
 if __name__ == '__main__':
   print(aes_ed('Saluton, Mondo!'), end='\n\n')
   print(rsa_ed('Saluton, Mondo!'), end='\n\n')
+  # Hybrid envelope: no length limit, and the RSA key is reused
+  recipient = default_rsa_key()
+  envelope = hybrid_encrypt(recipient.public_key(), b'Saluton, Mondo! ' * 100)
+  print(len(envelope), hybrid_decrypt(recipient, envelope)[:32], end='\n\n')
+  # Streaming throughput on 64 MiB of random data
+  for mode, rate in benchmark_stream().items():
+    print(f'{mode:>24} : {rate:10.1f} MB/s')
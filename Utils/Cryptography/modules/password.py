@@ -1,13 +1,25 @@
-# Password strength estimation library (uses heuristics and common patterns)
-from zxcvbn import zxcvbn
 # Secure password input without echoing to terminal
 from getpass import getpass
-# Modern password hashing library (bcrypt algorithm)
-import bcrypt
+# Per-entry audit results are written as JSON Lines
+import json
+# Progress output and timing for batch operations
+import sys
+import time
+# Bounded LRU memo for repeated passwords
+from collections import OrderedDict
+# bcrypt releases the GIL while hashing, so plain threads run in parallel;
+# zxcvbn is pure Python, so the audit spreads across processes instead
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Import colour utilities for terminal feedback
 from .ansicolours import colour_text, RED, YELLOW, GREEN
 
+# Password strength estimation library (uses heuristics and common patterns).
+# Importing it loads large frequency dictionaries, so it is only imported the first time it is needed.
+def zxcvbn(password):
+  from zxcvbn import zxcvbn as analyse
+  return analyse(password)
+
 # Assess password strength using zxcvbn scoring (0–4 scale)
 def check_strength(password):
   # Analyse password and return structured feedback
@@ -31,22 +43,206 @@ def check_strength(password):
   # Return formatted strength report
   return response
 
+# bcrypt's own default work factor; each step up doubles the cost
+DEFAULT_ROUNDS = 12
+# bcrypt only ever reads this many bytes of a password
+MAX_PASSWORD_BYTES = 72
+
+# The bytes bcrypt actually hashes. Classic bcrypt silently ignored everything past 72 bytes; bcrypt 5
+# raises ValueError instead. Truncating here keeps the classic behaviour, so long passphrases still hash
+# and hashes made by older versions (or other implementations) still verify.
+def _password_bytes(password):
+  return password.encode()[:MAX_PASSWORD_BYTES]
+
 # Hashing a password for storage
-def hash_pw(password):
+def hash_pw(password, rounds=DEFAULT_ROUNDS):
+  # Modern password hashing library (bcrypt algorithm), only loaded once hashing is needed
+  import bcrypt
   # Generate a random salt to prevent identical hashes for identical passwords
-  salt = bcrypt.gensalt()
+  salt = bcrypt.gensalt(rounds)
   # Hash password with salt using bcrypt algorithm
-  hashed = bcrypt.hashpw(password.encode(), salt)
+  hashed = bcrypt.hashpw(_password_bytes(password), salt)
   return hashed
 
 # Verify a password attempt against stored bcrypt hash
 def verify_pw(pw_attempt, hashed):
+  import bcrypt
   # If attempt matches stored hash, authentication succeeds
-  if bcrypt.checkpw(pw_attempt.encode(), hashed):
+  if bcrypt.checkpw(_password_bytes(pw_attempt), hashed.encode() if isinstance(hashed, str) else hashed):
     return f'{colour_text("Authenticated", GREEN)}. Access granted.'
   # Otherwise, deny access
   return f'{colour_text("Incorrect password", RED)}. Access denied.'
 
+# Batch Operations
+# A ready-made progress callback: a single self-overwriting line on stderr
+def print_progress(done, total, elapsed):
+  rate = done / elapsed if elapsed > 0 else 0.0
+  print(f'\r{done}/{total} ({rate:.1f}/s)', end='' if done < total else '\n', file=sys.stderr, flush=True)
+
+# Run `task` over `items` on a thread pool, preserving order.
+# Returns (results, metrics), where metrics holds the count, elapsed seconds and items per second.
+def _run_batch(task, items, workers, progress, every=100):
+  items = list(items)
+  results = []
+  started = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    for result in pool.map(task, items):
+      results.append(result)
+      # Report every `every` items, and once more at the end
+      if progress and (len(results) % every == 0 or len(results) == len(items)):
+        progress(len(results), len(items), time.perf_counter() - started)
+  elapsed = time.perf_counter() - started
+  metrics = {'count': len(results), 'seconds': elapsed, 'per_second': len(results) / elapsed if elapsed > 0 else 0.0}
+  return results, metrics
+
+# How many of `passwords` are longer than bcrypt reads (and so hashed by their first 72 bytes)
+def _count_truncated(passwords):
+  return sum(len(password.encode()) > MAX_PASSWORD_BYTES for password in passwords)
+
+# Hash many passwords at once; returns (hashes, metrics), with metrics['truncated'] counting over-long ones
+def hash_many(passwords, rounds=DEFAULT_ROUNDS, workers=None, progress=None):
+  passwords = list(passwords)
+  hashes, metrics = _run_batch(lambda password: hash_pw(password, rounds), passwords, workers, progress)
+  metrics['truncated'] = _count_truncated(passwords)
+  return hashes, metrics
+
+# One pair for verify_many(): True/False, or None when the stored hash is not valid bcrypt.
+# Hashes read from text exports arrive as str, so those are encoded first.
+def _check_pair(pair):
+  import bcrypt
+  password, hashed = pair
+  try:
+    return bcrypt.checkpw(_password_bytes(password), hashed.encode() if isinstance(hashed, str) else hashed)
+  # bcrypt raises ValueError('Invalid salt') for truncated or foreign hashes; anything else is a real bug
+  except ValueError as e:
+    if 'salt' not in str(e).lower():
+      raise
+    return None
+
+# Check many (password, hash) pairs at once; returns (list of True/False/None, metrics).
+# A malformed hash yields None for its row, and metrics['malformed'] counts them, rather than losing the batch.
+# metrics['truncated'] counts passwords longer than bcrypt reads; like hash_pw(), only their first 72 bytes count.
+def verify_many(pairs, workers=None, progress=None):
+  pairs = list(pairs)
+  results, metrics = _run_batch(_check_pair, pairs, workers, progress)
+  metrics['malformed'] = results.count(None)
+  metrics['truncated'] = _count_truncated(password for password, _ in pairs)
+  return results, metrics
+
+# Find the highest work factor whose hash time on this host stays within `target_ms`.
+# Returns (rounds, {rounds: median milliseconds}) for every cost that was measured.
+def calibrate_cost(target_ms=250, min_rounds=4, max_rounds=16, samples=3):
+  timings = {}
+  chosen = min_rounds
+  for rounds in range(min_rounds, max_rounds + 1):
+    runs = []
+    for _ in range(samples):
+      started = time.perf_counter()
+      hash_pw('calibration', rounds)
+      runs.append((time.perf_counter() - started) * 1000)
+    # The median shrugs off one unlucky scheduling hiccup
+    timings[rounds] = sorted(runs)[samples // 2]
+    if timings[rounds] > target_ms:
+      break
+    chosen = rounds
+  return chosen, timings
+
+# Bulk Strength Auditing
+# zxcvbn's cost climbs steeply with length; nothing past this many characters is analysed
+MAX_AUDIT_LENGTH = 64
+
+# Worker-side analysis, kept to the two fields the audit reports (must be top-level to be picklable)
+def _audit_score(password):
+  result = zxcvbn(password)
+  return result['score'], result['feedback'].get('warning') or ''
+
+# A dict that forgets its least recently used entry once it holds `maxsize` of them
+class LRUCache:
+  def __init__(self, maxsize):
+    self.maxsize = maxsize
+    self.entries = OrderedDict()
+
+  def get(self, key):
+    if key in self.entries:
+      self.entries.move_to_end(key)
+      return self.entries[key]
+    return None
+
+  def put(self, key, value):
+    self.entries[key] = value
+    self.entries.move_to_end(key)
+    if len(self.entries) > self.maxsize:
+      self.entries.popitem(last=False)
+
+# Score every password in `lines` (a wordlist, or `user<separator>password` lines from a dump).
+# Each entry becomes one JSON line on `out`: its label (username, or line number), length, whether
+# it was truncated, score and warning. The password itself is never written out.
+# With a separator, lines lacking it are skipped as malformed (the whole line may be the password),
+# and entries with an empty password are skipped too; neither reaches zxcvbn.
+# Returns a summary with the score histogram (index = score 0-4), skip counts and throughput figures.
+def audit_passwords(lines, out=None, separator=None, max_length=MAX_AUDIT_LENGTH, cache_size=100_000, workers=None, batch_size=1000):
+  cache = LRUCache(cache_size)
+  histogram = [0] * 5
+  count = analysed = malformed = empty = 0
+  started = time.perf_counter()
+
+  def flush(batch, pool):
+    nonlocal count, analysed
+    # Look each distinct password up once; the batch keeps its own copy even if a small cache evicts it
+    known = {password: cache.get(password) for _, password, _ in batch}
+    misses = [password for password, scored in known.items() if scored is None]
+    for password, scored in zip(misses, pool.map(_audit_score, misses, chunksize=64)):
+      known[password] = scored
+      cache.put(password, scored)
+    analysed += len(misses)
+    for label, password, length in batch:
+      score, warning = known[password]
+      histogram[score] += 1
+      count += 1
+      if out is not None:
+        entry = {'entry': label, 'length': length, 'truncated': length > max_length, 'score': score, 'warning': warning}
+        out.write(json.dumps(entry) + '\n')
+
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    batch = []
+    for number, line in enumerate(lines, 1):
+      line = line.rstrip('\r\n')
+      if not line:
+        continue
+      if separator:
+        label, found, password = line.partition(separator)
+        if not found:
+          malformed += 1
+          continue
+      else:
+        label, password = number, line
+      if not password:
+        empty += 1
+        continue
+      batch.append((label, password[:max_length], len(password)))
+      # Work in bounded batches, so a dump of any size streams through in constant memory
+      if len(batch) >= batch_size:
+        flush(batch, pool)
+        batch = []
+    if batch:
+      flush(batch, pool)
+
+  elapsed = time.perf_counter() - started
+  return {'histogram': histogram, 'count': count, 'analysed': analysed, 'cache_hits': count - analysed,
+          'malformed': malformed, 'empty': empty, 'seconds': elapsed, 'per_second': count / elapsed if elapsed > 0 else 0.0}
+
+# Render an audit summary as a coloured score histogram
+def print_histogram(summary, width=40):
+  colours = [RED, RED, RED, YELLOW, GREEN]
+  peak = max(summary['histogram']) or 1
+  for score, n in enumerate(summary['histogram']):
+    bar = colour_text('#' * round(n / peak * width), colours[score])
+    print(f'{score}/4 {n:>9} {bar}')
+  print(f'{summary["count"]} entries, {summary["analysed"]} analysed, {summary["cache_hits"]} from cache, '
+        f'{summary["per_second"]:.0f}/s')
+  if summary['malformed'] or summary['empty']:
+    print(f'Skipped {summary["malformed"]} malformed and {summary["empty"]} empty entries')
+
 # Demonstration loop when run directly
 if __name__ == '__main__':
   while True:
@@ -0,0 +1,203 @@
+# Tests for the streaming AES-GCM format.
+# Run from this directory: python -m unittest test_encryption
+
+import io
+import os
+import secrets
+import tempfile
+import unittest
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from modules import encryption
+from modules.encryption import HEADER_SIZE, SALT_SIZE, TAG_SIZE, decrypt_stream, encrypt_stream
+
+# Tiny segments, so multi-segment streams stay small
+SEGMENT = 64
+
+def encrypt(key, data, workers=1):
+  out = io.BytesIO()
+  encrypt_stream(key, io.BytesIO(data), out, SEGMENT, workers)
+  return out.getvalue()
+
+def decrypt(key, data, workers=1):
+  out = io.BytesIO()
+  decrypt_stream(key, io.BytesIO(data), out, workers)
+  return out.getvalue()
+
+# Split a stream into its header and sealed segments
+def split(stream):
+  body = stream[HEADER_SIZE:]
+  step = SEGMENT + TAG_SIZE
+  return stream[:HEADER_SIZE], [body[i:i + step] for i in range(0, len(body), step)]
+
+class StreamRoundTripTest(unittest.TestCase):
+  def setUp(self):
+    self.key = secrets.token_bytes(32)
+
+  # Empty, short, exactly N segments, and N segments plus one byte
+  def test_round_trip_at_segment_boundaries(self):
+    for size in (0, 1, SEGMENT, 3 * SEGMENT, 3 * SEGMENT + 1):
+      data = secrets.token_bytes(size)
+      with self.subTest(size=size):
+        self.assertEqual(decrypt(self.key, encrypt(self.key, data)), data)
+
+  # The parallel pipeline must produce the same format, in order, as the sequential one
+  def test_workers_round_trip_both_ways(self):
+    data = secrets.token_bytes(20 * SEGMENT + 7)
+    for enc_workers, dec_workers in ((4, 1), (1, 4), (4, 4)):
+      with self.subTest(encrypt=enc_workers, decrypt=dec_workers):
+        self.assertEqual(decrypt(self.key, encrypt(self.key, data, enc_workers), dec_workers), data)
+
+  def test_segment_size_is_validated(self):
+    for size in (0, encryption.MAX_SEGMENT_SIZE + 1):
+      with self.subTest(size=size), self.assertRaises(ValueError):
+        encrypt_stream(self.key, io.BytesIO(b'data'), io.BytesIO(), size)
+
+class StreamTamperTest(unittest.TestCase):
+  def setUp(self):
+    self.key = secrets.token_bytes(32)
+    self.stream = encrypt(self.key, secrets.token_bytes(3 * SEGMENT + 10))
+
+  # Dropping whole trailing segments leaves a non-final segment last
+  def test_truncation_at_segment_boundary(self):
+    header, segments = split(self.stream)
+    for keep in (0, 1, 2, 3):
+      with self.subTest(keep=keep), self.assertRaises(InvalidTag):
+        decrypt(self.key, header + b''.join(segments[:keep]))
+
+  def test_segment_reordering(self):
+    header, segments = split(self.stream)
+    segments[0], segments[1] = segments[1], segments[0]
+    with self.assertRaises(InvalidTag):
+      decrypt(self.key, header + b''.join(segments))
+
+  # Salt and nonce prefix feed the subkey and nonces; the rest of the header is checked up front
+  def test_flipped_header_byte(self):
+    for offset in range(HEADER_SIZE):
+      tampered = bytearray(self.stream)
+      tampered[offset] ^= 0x01
+      with self.subTest(offset=offset), self.assertRaises((InvalidTag, ValueError)):
+        decrypt(self.key, bytes(tampered))
+
+  def test_flipped_ciphertext_byte(self):
+    tampered = bytearray(self.stream)
+    tampered[HEADER_SIZE + SEGMENT + 5] ^= 0x01
+    with self.assertRaises(InvalidTag):
+      decrypt(self.key, bytes(tampered))
+
+  def test_wrong_key(self):
+    with self.assertRaises(InvalidTag):
+      decrypt(secrets.token_bytes(32), self.stream)
+
+  # A failed decryption leaves neither the target nor a temporary file behind
+  def test_decrypt_file_publishes_nothing_on_failure(self):
+    with tempfile.TemporaryDirectory() as workdir:
+      tampered = bytearray(self.stream)
+      tampered[-1] ^= 0x01
+      with open(os.path.join(workdir, 'in.enc'), 'wb') as file:
+        file.write(tampered)
+      with self.assertRaises(InvalidTag):
+        encryption.decrypt_file(self.key, os.path.join(workdir, 'in.enc'), os.path.join(workdir, 'out.bin'))
+      self.assertEqual(os.listdir(workdir), ['in.enc'])
+
+class StreamKeyReuseTest(unittest.TestCase):
+  # Each stream gets its own salt, and its segments are sealed under a subkey rather than the key itself
+  def test_streams_under_one_key_use_distinct_subkeys(self):
+    key = secrets.token_bytes(32)
+    first, second = encrypt(key, b'same plaintext'), encrypt(key, b'same plaintext')
+    self.assertNotEqual(first[8:8 + SALT_SIZE], second[8:8 + SALT_SIZE])
+    self.assertNotEqual(first[HEADER_SIZE:], second[HEADER_SIZE:])
+    header, segments = split(first)
+    nonce = header[-7:] + (0).to_bytes(4, 'big') + b'\x01'
+    with self.assertRaises(InvalidTag):
+      AESGCM(key).decrypt(nonce, segments[0], header)
+
+class HybridEnvelopeTest(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.recipient = encryption.generate_rsa_key()
+    cls.other = encryption.generate_rsa_key()
+
+  def setUp(self):
+    self.workdir = tempfile.mkdtemp()
+    self.data = secrets.token_bytes(3 * 1024 * 1024 + 17)
+    self.plain = os.path.join(self.workdir, 'plain.bin')
+    self.sealed = os.path.join(self.workdir, 'sealed.bin')
+    self.out = os.path.join(self.workdir, 'out.bin')
+    with open(self.plain, 'wb') as file:
+      file.write(self.data)
+    encryption.hybrid_encrypt_file(self.recipient.public_key(), self.plain, self.sealed, workers=2)
+    with open(self.sealed, 'rb') as file:
+      self.envelope = file.read()
+
+  def tearDown(self):
+    for name in os.listdir(self.workdir):
+      os.remove(os.path.join(self.workdir, name))
+    os.rmdir(self.workdir)
+
+  # Decrypt a (possibly tampered) file envelope; nothing may be published if it fails
+  def open_envelope(self, envelope, key=None):
+    with open(self.sealed, 'wb') as file:
+      file.write(envelope)
+    try:
+      encryption.hybrid_decrypt_file(key or self.recipient, self.sealed, self.out)
+    except (InvalidTag, ValueError):
+      self.assertFalse(os.path.exists(self.out))
+      self.assertEqual(sorted(os.listdir(self.workdir)), ['plain.bin', 'sealed.bin'])
+      raise
+    with open(self.out, 'rb') as file:
+      return file.read()
+
+  def test_message_round_trip(self):
+    for data in (b'', b'Saluton, Mondo!', secrets.token_bytes(100_000)):
+      with self.subTest(length=len(data)):
+        envelope = encryption.hybrid_encrypt(self.recipient.public_key(), data)
+        self.assertEqual(encryption.hybrid_decrypt(self.recipient, envelope), data)
+
+  def test_file_round_trip(self):
+    self.assertEqual(self.open_envelope(self.envelope), self.data)
+
+  def test_wrong_key(self):
+    envelope = encryption.hybrid_encrypt(self.recipient.public_key(), b'secret')
+    with self.assertRaises(ValueError):
+      encryption.hybrid_decrypt(self.other, envelope)
+    with self.assertRaises(ValueError):
+      self.open_envelope(self.envelope, self.other)
+
+  # Byte 6 onwards is the RSA-wrapped AES key
+  def test_corrupted_wrapped_key(self):
+    envelope = bytearray(encryption.hybrid_encrypt(self.recipient.public_key(), b'secret'))
+    envelope[10] ^= 0x01
+    with self.assertRaises(ValueError):
+      encryption.hybrid_decrypt(self.recipient, bytes(envelope))
+    envelope = bytearray(self.envelope)
+    envelope[10] ^= 0x01
+    with self.assertRaises(ValueError):
+      self.open_envelope(bytes(envelope))
+
+  # Cut inside the magic, inside the wrapped key, right after it, and inside the stream
+  def test_truncated_file_envelope(self):
+    wrapped_end = 6 + int.from_bytes(self.envelope[4:6], 'big')
+    for length in (2, 100, wrapped_end, wrapped_end + HEADER_SIZE, len(self.envelope) - 1):
+      with self.subTest(length=length), self.assertRaises((InvalidTag, ValueError)):
+        self.open_envelope(self.envelope[:length])
+
+class PrivateKeyFileTest(unittest.TestCase):
+  # Overwriting an existing world-readable file must still leave the key owner-only
+  @unittest.skipIf(os.name != 'posix', 'POSIX permission bits')
+  def test_saved_key_is_owner_only_even_when_overwriting(self):
+    with tempfile.TemporaryDirectory() as workdir:
+      path = os.path.join(workdir, 'id.pem')
+      with open(path, 'w') as file:
+        file.write('old')
+      os.chmod(path, 0o644)
+      key = encryption.generate_rsa_key()
+      encryption.save_private_key(key, path)
+      self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+      self.assertEqual(os.listdir(workdir), ['id.pem'])
+      self.assertEqual(encryption.load_private_key(path).private_numbers(), key.private_numbers())
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,60 @@
+# Regression tests for batch bcrypt and the bulk password audit.
+# Run from this directory: python -m unittest test_password
+
+import io
+import json
+import unittest
+
+from modules.password import audit_passwords, hash_many, hash_pw, verify_many
+
+class BatchBcryptTest(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.hashed = hash_pw('hunter2', 4)
+
+  # Hashes read from a text or CSV export are str, not bytes
+  def test_str_hashes_verify(self):
+    results, metrics = verify_many([('hunter2', self.hashed.decode()), ('wrong', self.hashed.decode())])
+    self.assertEqual(results, [True, False])
+    self.assertEqual(metrics['malformed'], 0)
+
+  def test_malformed_hash_is_reported_per_row(self):
+    results, metrics = verify_many([('hunter2', 'not-a-bcrypt-hash'), ('hunter2', self.hashed)])
+    self.assertEqual(results, [None, True])
+    self.assertEqual(metrics['malformed'], 1)
+
+  # bcrypt 5 raises past 72 bytes; we truncate explicitly, as classic bcrypt always did
+  def test_long_passwords_are_truncated_not_fatal(self):
+    long_password = 'a' * 80
+    hashes, metrics = hash_many([long_password, 'ok'], rounds=4)
+    self.assertEqual(len(hashes), 2)
+    self.assertEqual(metrics['truncated'], 1)
+    results, metrics = verify_many([(long_password, hashes[0]), ('a' * 72 + 'b' * 8, hashes[0]), ('a' * 71, hashes[0])])
+    self.assertEqual(results, [True, True, False])
+    self.assertEqual(metrics['malformed'], 0)
+    self.assertEqual(metrics['truncated'], 2)
+
+class AuditMalformedEntriesTest(unittest.TestCase):
+  def audit(self, lines):
+    out = io.StringIO()
+    summary = audit_passwords(lines, out, separator=':', workers=1)
+    return summary, [json.loads(line) for line in out.getvalue().splitlines()]
+
+  # A dump line without the separator is all password: skip it, and never echo it as a label
+  def test_line_without_separator_is_skipped_and_not_written(self):
+    summary, entries = self.audit(['NoSeparatorSecret\n', 'bob:correct horse battery staple\n'])
+    self.assertEqual(summary['malformed'], 1)
+    self.assertEqual(summary['count'], 1)
+    self.assertEqual([entry['entry'] for entry in entries], ['bob'])
+    self.assertNotIn('NoSeparatorSecret', json.dumps(entries))
+
+  # `alice:` has no password to score; zxcvbn('') would raise inside the pool
+  def test_empty_password_is_skipped(self):
+    summary, entries = self.audit(['alice:\n', 'bob:hunter2\n'])
+    self.assertEqual(summary['empty'], 1)
+    self.assertEqual(summary['count'], 1)
+    self.assertEqual(sum(summary['histogram']), 1)
+    self.assertEqual([entry['entry'] for entry in entries], ['bob'])
+
+if __name__ == '__main__':
+  unittest.main()